@@ -0,0 +1,6 @@
+class BudgetExceededError(Exception):
+    """Custom exception raised when the cycle budget runs out before a check completes."""
+    def __init__(self, url, message="Cycle budget exhausted"):
+        self.url = url
+        self.message = f"{message}: '{url}'"
+        super().__init__(self.message)
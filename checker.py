@@ -1,16 +1,28 @@
+import gc
+import json
 import logging
+import threading
 import time
 from datetime import datetime, timezone
 
 import requests
+import urllib3
 from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from budget_exceeded_error import BudgetExceededError
 from json_path_error import JSONPathError
-from services import ConfigurationService, SeleniumSession
+from services import ConfigurationService, CycleBudget, SeleniumSession, compile_json_path
+from xhr_discovery import capture_page, discover_api_rule, suggest_api_rule
 
+# Time in seconds before retrying discovery on a page where no backing API was found
+XHR_DISCOVERY_RETRY = 24 * 60 * 60
+# Consecutive failures of a discovered API before it is dropped and discovered again
+XHR_DISCOVERY_MAX_FAILURES = 3
 
-def update_daily_log_by_url(url, success=0, fail=0):
+
+def update_daily_log_by_url(url, success=0, fail=0, deferred=0):
     """
-    Updates (or creates) a daily log file that tracks the number of successful and failed checks by URL.
+    Updates (or creates) a daily log file that tracks the number of successful, failed and deferred checks by URL.
     """
     config_service = ConfigurationService()
     file_service = config_service.get_config("file_service")
@@ -21,55 +33,219 @@ def update_daily_log_by_url(url, success=0, fail=0):
         daily_log[today] = {}
     
     if url not in daily_log[today]:
-        daily_log[today][url] = {"success": 0, "fail": 0}
+        daily_log[today][url] = {"success": 0, "fail": 0, "deferred": 0}
     
     daily_log[today][url]["success"] += success
     daily_log[today][url]["fail"] += fail
+    daily_log[today][url]["deferred"] = daily_log[today][url].get("deferred", 0) + deferred
 
     file_service.save_json('daily_log.json', daily_log)
 
 
 def check_availability():
     config_service = ConfigurationService()
-    rules = config_service.get_config("rules")
-    selenium_session = SeleniumSession() if any(rule.get("use_selenium", False) for rule in rules.values()) else None
+    rule_plans = config_service.get_config("rule_plans")
+    selenium_session = get_selenium_session(rule_plans)
+
+    budget = CycleBudget(config_service.get_config("cycle_budget"))
+    last_checked = config_service.get_config("last_checked")
+    if last_checked is None:
+        last_checked = {}
+        config_service.set_config("last_checked", last_checked)
+
+    dns_cache = config_service.get_config("dns_cache")
+    if dns_cache:
+        prefetch_hosts(dns_cache, rule_plans.values())
+
+    # Highest priority first, then the rules that have waited the longest
+    ordered_plans = sorted(rule_plans.values(), key=lambda plan: (-plan.priority, last_checked.get(plan.url, 0)))
+
+    for index, plan in enumerate(ordered_plans):
+        if budget.exhausted():
+            for deferred_plan in ordered_plans[index:]:
+                defer_check(deferred_plan.url)
+            break
+
+        try:
+            if plan.api_check:
+                check_api_availability(plan, budget)
+            elif plan.webpage_check and plan.xhr_discovery and selenium_session:
+                check_xhr_discovery_availability(plan, selenium_session, budget)
+            elif plan.webpage_check:
+                check_webpage_availability(plan, selenium_session, budget)
+        except BudgetExceededError:
+            defer_check(plan.url)
+            continue
+        last_checked[plan.url] = time.time()
+
+    config_service.get_config("routine_log").flush()
+
+
+def get_selenium_session(rule_plans):
+    """
+    Returns the browser session shared by every cycle, starting it if needed. None if no rule uses Selenium.
+    """
+    config_service = ConfigurationService()
+    if not any(plan.use_selenium for plan in rule_plans.values()):
+        return None
+    selenium_session = config_service.get_config("selenium_session")
+    if selenium_session is None:
+        selenium_session = SeleniumSession(capture_network=any(plan.xhr_discovery for plan in rule_plans.values()))
+        config_service.set_config("selenium_session", selenium_session)
+    return selenium_session
+
+
+def release_memory():
+    """
+    Frees what can be rebuilt when the process is over its memory budget: the file cache and the browser,
+    which is restarted on the next cycle.
+    """
+    ConfigurationService().get_config("file_service").clear_cache()
+    recycle_selenium_session()
+    gc.collect()
+
+
+def recycle_selenium_session():
+    """
+    Closes the shared browser session so the next cycle starts a new one.
+    """
+    config_service = ConfigurationService()
+    selenium_session = config_service.get_config("selenium_session")
+    if selenium_session is not None:
+        logging.info("Recycling the Selenium session")
+        config_service.set_config("selenium_session", None)
+        try:
+            selenium_session.close()
+        except Exception as e:
+            logging.error(f"Error closing the Selenium session: {e}")
+
 
-    for url, rule in rules.items():
-        if rule.get("api_check", False):
-            check_api_availability(url, rule)
-        elif rule.get("webpage_check", False):
-            check_webpage_availability(url, rule, selenium_session)
+def defer_check(url):
+    """
+    Records a check that was skipped because the cycle budget ran out. Deferred checks are not failures.
+    """
+    logging.warning(f"Deferred check for {url}: cycle budget exhausted")
+    update_daily_log_by_url(url, deferred=1)
 
 
-def check_webpage_availability(url, rule, selenium_session):
+def fetch(url, headers, timeout, budget, proxies=None):
+    """
+    Sends a GET request bounded by the connect and read timeouts and by a total deadline of `timeout` seconds,
+    so a slow-drip server cannot keep the request open. The deadline is clipped to the cycle budget.
+    Returns the response and its body as bytes.
+    Raises BudgetExceededError if the cycle budget runs out before the response is fully read.
+    """
+    configuration_service = ConfigurationService()
+    timeout, budget_bound = budget.request_timeout(timeout)
+    deadline = time.monotonic() + timeout
+
+    def remaining():
+        left = deadline - time.monotonic()
+        if left <= 0:
+            if budget_bound:
+                raise BudgetExceededError(url)
+            raise requests.exceptions.Timeout(f"Total timeout of {timeout}s exceeded for {url}")
+        return left
+
+    connect_timeout = min(configuration_service.get_config("connect_timeout") or timeout, remaining())
+    read_timeout = min(configuration_service.get_config("read_timeout") or timeout, remaining())
+
+    try:
+        # requests adds environment proxies to the mapping it is given, so pass a copy
+        response = requests.get(url, headers=headers, timeout=(connect_timeout, read_timeout), proxies=dict(proxies or {}), stream=True)
+        with response:
+            response.raise_for_status()
+            # Unblocks a read still waiting on the socket when the deadline passes
+            watchdog = threading.Timer(remaining(), response.raw.shutdown)
+            watchdog.start()
+            try:
+                chunks = []
+                while True:
+                    remaining()
+                    try:
+                        # Returns as soon as any data arrives instead of waiting for a full chunk
+                        chunk = response.raw.read1(8192, decode_content=True)
+                    except urllib3.exceptions.ReadTimeoutError as e:
+                        remaining()
+                        raise requests.exceptions.ReadTimeout(e)
+                    except urllib3.exceptions.ProtocolError as e:
+                        remaining()
+                        raise requests.exceptions.ChunkedEncodingError(e)
+                    except urllib3.exceptions.DecodeError as e:
+                        raise requests.exceptions.ContentDecodingError(e)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                remaining()
+            finally:
+                watchdog.cancel()
+    except requests.exceptions.Timeout:
+        if budget_bound and time.monotonic() >= deadline:
+            raise BudgetExceededError(url)
+        raise
+    return response, b"".join(chunks)
+
+
+def prefetch_hosts(dns_cache, rule_plans):
+    """
+    Resolves the hostnames of every rule URL before the cycle starts so checks do not wait on the resolver.
+    API checks go through the SOCKS5 proxy when one is configured: with socks5h:// the proxy resolves them,
+    so only the proxy host itself is resolved locally.
+    """
+    proxy = ConfigurationService().get_config("socks5-proxy")
+    webpage_origins = [plan.origin for plan in rule_plans if not plan.api_check]
+    api_origins = [plan.origin for plan in rule_plans if plan.api_check]
+
+    if proxy and api_origins:
+        dns_cache.prefetch([proxy["https"]], proxy=True)
+        if not proxy["https"].startswith("socks5h://"):
+            dns_cache.prefetch(api_origins, socks=True)
+    else:
+        webpage_origins += api_origins
+    dns_cache.prefetch(webpage_origins)
+
+
+def check_webpage_availability(plan, selenium_session, budget, page_content=None):
     """
     Check the availability of a webpage and compare the HTML content with the previous data.
+    `page_content` is the already rendered page, if any, in which case the page is not fetched again.
     """
+    url = plan.url
     configuration_service = ConfigurationService()
     notification_manager = configuration_service.get_config("notification_manager")
     file_service = configuration_service.get_config("file_service")
+    routine_log = configuration_service.get_config("routine_log")
     missing_data = file_service.load_json('missing_data.json')
     previous_data = file_service.load_json('previous_data.json')
     current_data = previous_data.copy()
-    selectors = rule.get("selectors", [])
-    use_selenium = rule.get("use_selenium", False)
 
     try:
-        if use_selenium and selenium_session:
-            page_content = selenium_session.fetch_page(url)
+        if page_content is not None:
+            encoding = None
+        elif plan.use_selenium and selenium_session:
+            timeout, budget_bound = budget.request_timeout(configuration_service.get_config("selenium_timeout"))
+            try:
+                page_content = selenium_session.fetch_page(url, timeout)
+                encoding = None
+            except TimeoutException:
+                if budget_bound:
+                    raise BudgetExceededError(url)
+                raise
+            except WebDriverException:
+                # The browser crashed or the session is gone, start a new one on the next cycle
+                recycle_selenium_session()
+                raise
         else:
-            headers = {
-                "User-Agent": configuration_service.get_config("webpage_user_agent")
-            }
-            response = requests.get(url, headers=headers, timeout=configuration_service.get_config("webpage_timeout"))
-            response.raise_for_status()
-            page_content = response.text
+            response, page_content = fetch(url, plan.headers, configuration_service.get_config("webpage_timeout"), budget, proxies=plan.proxies)
+            # Decode with the charset of the Content-Type header, as response.text would
+            encoding = response.encoding
     
-        soup = BeautifulSoup(page_content, 'html.parser')
+        soup = BeautifulSoup(page_content, 'html.parser', from_encoding=encoding)
 
-        for selector in selectors:
-            element = soup.select_one(selector)
-            key = f"{url}:{selector}"
+        for selector_plan in plan.selectors:
+            selector = selector_plan.selector
+            element = selector_plan.compiled.select_one(soup)
+            key = selector_plan.key
 
             if element is None:
                 logging.warning(f"Element missing for {url} with selector {selector}")
@@ -111,58 +287,154 @@ def check_webpage_availability(url, rule, selenium_session):
                     "Last Updated": last_updated,
                 })
             else:
-                logging.info(f"No change detected for {url} with selector {selector}")
-        
+                routine_log.record(url, "No change detected for %s with selector %s", url, selector)
+
+        # Break the tree's reference cycles now rather than on the next garbage collection
+        soup.decompose()
         file_service.save_json('missing_data.json', missing_data)
         update_daily_log_by_url(url, success=1)
 
+    except BudgetExceededError:
+        raise
     except Exception as e:
         logging.error(f"Error fetching webpage content from {url}: {e}")
         update_daily_log_by_url(url, fail=1)
         if not isinstance(e, (requests.exceptions.HTTPError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)) or \
             (
-                isinstance(e, (requests.exceptions.HTTPError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)) and rule.get("notification_on_error", True)
+                isinstance(e, (requests.exceptions.HTTPError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)) and plan.notification_on_error
             ):
             notification_manager.send("webpage_check_failed", url=url, fields={"URL": url, "Exception": f"`{e}`"})
 
 
-def check_api_availability(api_url, rule):
+def check_xhr_discovery_availability(plan, selenium_session, budget):
+    """
+    Check a Selenium rule through the JSON API backing its page, discovering the API first if needed.
+    Falls back to the rendered page when no API is known or the discovered API rule breaks.
+    """
+    url = plan.url
+    configuration_service = ConfigurationService()
+    notification_manager = configuration_service.get_config("notification_manager")
+    file_service = configuration_service.get_config("file_service")
+    discovered_apis = file_service.load_json('discovered_apis.json')
+    discovered = discovered_apis.get(url)
+    discovered_plans = configuration_service.get_config("discovered_plans")
+    if discovered_plans is None:
+        discovered_plans = {}
+        configuration_service.set_config("discovered_plans", discovered_plans)
+
+    # Page rendered during discovery, compared directly instead of rendering it again
+    page_content = None
+
+    if discovered is None or (not discovered["api_url"] and time.time() - discovered["timestamp"] > XHR_DISCOVERY_RETRY):
+        timeout, budget_bound = budget.request_timeout(configuration_service.get_config("selenium_timeout"))
+        # Only a page that rendered with no matching JSON response stops discovery for XHR_DISCOVERY_RETRY,
+        # any other problem is retried on the next cycle
+        result = None
+        conclusive = False
+        try:
+            page_content, json_responses = capture_page(plan, selenium_session, timeout)
+            result = discover_api_rule(plan, page_content, json_responses)
+            conclusive = True
+        except TimeoutException as e:
+            if budget_bound:
+                raise BudgetExceededError(url)
+            logging.error(f"Error discovering the API behind {url}: {e}")
+        except ValueError as e:
+            logging.info(f"API discovery postponed: {e}")
+        except WebDriverException as e:
+            # The browser crashed or the session is gone, start a new one on the next cycle
+            logging.error(f"Error discovering the API behind {url}: {e}")
+            recycle_selenium_session()
+            update_daily_log_by_url(url, fail=1)
+            return
+        except Exception as e:
+            logging.error(f"Error discovering the API behind {url}: {e}")
+            page_content = None
+
+        if result:
+            api_url, json_selectors = result
+            api_rule = suggest_api_rule(plan, json_selectors)
+            discovered = {"api_url": api_url, "json_selectors": api_rule["json_selectors"], "timestamp": time.time()}
+            notification_manager.send("xhr_api_discovered", url=url, fields={
+                "URL": url,
+                "API URL": api_url,
+                "JSON Selectors": "\n".join(f"`{selector}`" for selector in api_rule["json_selectors"]),
+            })
+        elif conclusive:
+            discovered = {"api_url": None, "timestamp": time.time()}
+        if result or conclusive:
+            discovered_apis[url] = discovered
+            file_service.save_json('discovered_apis.json', discovered_apis)
+
+    if discovered and discovered["api_url"]:
+        api_plan = discovered_plans.get(url)
+        if api_plan is None or api_plan.url != discovered["api_url"]:
+            api_plan = configuration_service.compile_rule(discovered["api_url"], {
+                "api_check": True,
+                "json_selectors": discovered["json_selectors"],
+                "discovered_from": url,
+            })
+            discovered_plans[url] = api_plan
+        if check_api_availability(api_plan, budget):
+            if discovered.get("failures"):
+                discovered["failures"] = 0
+                file_service.save_json('discovered_apis.json', discovered_apis)
+            return
+
+        discovered["failures"] = discovered.get("failures", 0) + 1
+        logging.warning(
+            f"Discovered API {discovered['api_url']} for {url} failed "
+            f"({discovered['failures']}/{XHR_DISCOVERY_MAX_FAILURES}), falling back to rendering"
+        )
+        if discovered["failures"] >= XHR_DISCOVERY_MAX_FAILURES:
+            notification_manager.send("xhr_api_fallback", url=url, fields={"URL": url, "API URL": discovered["api_url"]})
+            # Discover again on the next cycle
+            del discovered_apis[url]
+            del discovered_plans[url]
+        file_service.save_json('discovered_apis.json', discovered_apis)
+
+    check_webpage_availability(plan, selenium_session, budget, page_content)
+
+
+def check_api_availability(plan, budget):
     """
     Check the availability of an API endpoint and compare the JSON data with the previous data.
+    Returns whether the check succeeded.
     """
+    api_url = plan.url
+    # A discovered API is reported under the page it was discovered from, the rule the user configured
+    log_url = plan.discovered_from or api_url
     configuration_service = ConfigurationService()
     notification_manager = configuration_service.get_config("notification_manager")
     file_service = configuration_service.get_config("file_service")
+    routine_log = configuration_service.get_config("routine_log")
     previous_data = file_service.load_json('previous_data.json')
     current_data = previous_data.copy()
-    headers = {
-        "User-Agent": configuration_service.get_config("api_user_agent"),
-        "Accept": "application/json"
-    }
 
     try:
-        response = requests.get(
+        _, content = fetch(
             api_url,
-            headers=headers,
-            timeout=configuration_service.get_config("api_timeout"),
-            proxies=configuration_service.get_config("socks5_proxy", {})
+            plan.headers,
+            configuration_service.get_config("api_timeout"),
+            budget,
+            proxies=plan.proxies
         )
-        response.raise_for_status()
-        data = response.json()
+        data = json.loads(content)
 
         if not data:
             logging.warning(f"No data found for {api_url}")
-            update_daily_log_by_url(api_url, success=1)
-            return
+            update_daily_log_by_url(log_url, success=1)
+            return True
         
-        json_selectors = rule.get("json_selectors", [])
-        extracted_data = {selector: extract_json_value(data, selector) for selector in json_selectors}
+        extracted_data = {
+            selector_plan.selector: extract_json_value(data, selector_plan.selector, selector_plan.keys)
+            for selector_plan in plan.json_selectors
+        }
 
-        current_data[api_url] = {"json": extracted_data, "timestamp": time.time()}
+        current_data[plan.state_key] = {"json": extracted_data, "timestamp": time.time()}
 
         for selector, new_value in extracted_data.items():
-            key = f"{api_url}:{selector}"
-            old_value = previous_data.get(api_url, {}).get("json", {}).get(selector)
+            old_value = previous_data.get(plan.state_key, {}).get("json", {}).get(selector)
 
             if old_value is None:
                 logging.info(f"First-time API tracking for {api_url} selector `{selector}`")
@@ -173,8 +445,8 @@ def check_api_availability(api_url, rule):
                 })
             elif old_value != new_value:
                 logging.info(f"API data changed for {api_url} selector `{selector}`")
-                if 'timestamp' in previous_data[key]:
-                    last_updated = datetime.fromtimestamp(previous_data[key]['timestamp'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S') + ' UTC'
+                if 'timestamp' in previous_data[plan.state_key]:
+                    last_updated = datetime.fromtimestamp(previous_data[plan.state_key]['timestamp'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S') + ' UTC'
                 else:
                     last_updated = "N/A"
                 notification_manager.send("api_content_change", url=api_url, fields={
@@ -185,30 +457,39 @@ def check_api_availability(api_url, rule):
                     "Last Updated": last_updated
                 })
             else:
-                logging.info(f"No change detected for {api_url} with selector `{selector}`")
+                routine_log.record(api_url, "No change detected for %s with selector `%s`", api_url, selector)
         
         file_service.save_json('previous_data.json', current_data)
-        update_daily_log_by_url(api_url, success=1)
+        update_daily_log_by_url(log_url, success=1)
+        return True
 
+    except BudgetExceededError:
+        raise
     except Exception as e:
         logging.error(f"Error fetching API data from {api_url}: {e}")
+        if plan.discovered_from:
+            # The caller falls back to rendering the page, which records the outcome of the check
+            return False
         update_daily_log_by_url(api_url, fail=1)
         if not isinstance(e, (requests.exceptions.HTTPError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)) or \
             (
-                isinstance(e, (requests.exceptions.HTTPError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)) and rule.get("notification_on_error", True)
+                isinstance(e, (requests.exceptions.HTTPError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)) and plan.notification_on_error
             ):
             notification_manager.send("api_check_failed", url=api_url, fields={"URL": api_url, "Exception": f"`{e}`"})
+        return False
 
 
-def extract_json_value(json_data, path):
+def extract_json_value(json_data, path, keys=None):
     """
     Extracts a value from a nested JSON object using dot notation.
     Supports the placeholder '<x>' to iterate over a list.
     
     For example, 'days.<x>.day' will extract the 'day' attribute from every item in the 'days' list.
+    `keys` can be the path already split by compile_json_path.
     Raises JSONPathError if a key/index is missing or if the placeholder is applied to a non-list.
     """
-    keys = path.split(".")
+    if keys is None:
+        keys = compile_json_path(path)
 
     def helper(current, keys_remaining):
         if not keys_remaining:
@@ -225,9 +506,7 @@ def extract_json_value(json_data, path):
                 results.append(helper(item, keys_remaining[1:]))
             return results
         else:
-            # Handle numeric keys for list indices (e.g., '0', '1', etc.)
-            if key.isdigit():
-                key = int(key)
+            # Numeric keys for list indices (e.g., '0', '1', etc.) are already integers
             try:
                 next_value = current[key]
             except (KeyError, IndexError, TypeError) as e:
@@ -32,7 +32,20 @@ CMD=(
 [ -n "$API_USER_AGENT" ] && CMD+=("--api-user-agent" "$API_USER_AGENT")
 [ -n "$WEBPAGE_TIMEOUT" ] && CMD+=("--webpage-timeout" "$WEBPAGE_TIMEOUT")
 [ -n "$API_TIMEOUT" ] && CMD+=("--api-timeout" "$API_TIMEOUT")
+[ -n "$SELENIUM_TIMEOUT" ] && CMD+=("--selenium-timeout" "$SELENIUM_TIMEOUT")
+[ -n "$CONNECT_TIMEOUT" ] && CMD+=("--connect-timeout" "$CONNECT_TIMEOUT")
+[ -n "$READ_TIMEOUT" ] && CMD+=("--read-timeout" "$READ_TIMEOUT")
+[ -n "$CYCLE_BUDGET" ] && CMD+=("--cycle-budget" "$CYCLE_BUDGET")
 [ -n "SOCKS5_PROXY" ] && CMD+=("--socks5-proxy" "$SOCKS5_PROXY")
+[ "$SOCKS5_REMOTE_DNS" = "true" ] && CMD+=("--socks5-remote-dns")
+[ -n "$DNS_TTL" ] && CMD+=("--dns-ttl" "$DNS_TTL")
+[ -n "$DNS_NEGATIVE_TTL" ] && CMD+=("--dns-negative-ttl" "$DNS_NEGATIVE_TTL")
+[ -n "$LOG_FORMAT" ] && CMD+=("--log-format" "$LOG_FORMAT")
+[ -n "$LOG_SAMPLE_RATE" ] && CMD+=("--log-sample-rate" "$LOG_SAMPLE_RATE")
+[ -n "$MEMORY_BUDGET" ] && CMD+=("--memory-budget" "$MEMORY_BUDGET")
+[ -n "$FILE_CACHE_SIZE" ] && CMD+=("--file-cache-size" "$FILE_CACHE_SIZE")
+[ -n "$MEMORY_SNAPSHOT_INTERVAL" ] && CMD+=("--memory-snapshot-interval" "$MEMORY_SNAPSHOT_INTERVAL")
+[ -n "$TRACEMALLOC_TOP" ] && CMD+=("--tracemalloc-top" "$TRACEMALLOC_TOP")
 
 # Run the application
 "${CMD[@]}"
@@ -5,17 +5,9 @@ from datetime import datetime, timedelta
 
 from vha_toolbox import seconds_to_humantime
 from check_version import check_for_update
-from checker import check_availability
+from checker import check_availability, release_memory
 from services import *
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ],
-)
-
 
 def parse_arguments():
     """Parses command-line arguments."""
@@ -47,8 +39,24 @@ def parse_arguments():
 
     parser.add_argument('--webpage-timeout', type=int, default=5, help="Timeout for webpage checks in seconds.")
     parser.add_argument('--api-timeout', type=int, default=5, help="Timeout for API checks in seconds.")
+    parser.add_argument('--selenium-timeout', type=int, default=30, help="Timeout for Selenium page renders in seconds.")
+    parser.add_argument('--connect-timeout', type=int, help="Timeout for establishing connections in seconds. Defaults to the check timeout.")
+    parser.add_argument('--read-timeout', type=int, help="Timeout between received bytes in seconds. Defaults to the check timeout.")
+    parser.add_argument('--cycle-budget', type=int, help="Time budget for a whole check cycle in seconds. Defaults to the interval.")
 
     parser.add_argument('--socks5-proxy', type=str, help="SOCKS5 proxy for connections.")
+    parser.add_argument('--socks5-remote-dns', action='store_true', help="Let the SOCKS5 proxy resolve hostnames.")
+
+    parser.add_argument('--dns-ttl', type=int, default=300, help="Time in seconds to cache resolved hostnames.")
+    parser.add_argument('--dns-negative-ttl', type=int, default=30, help="Time in seconds to cache failed hostname lookups.")
+
+    parser.add_argument('--log-format', type=str, choices=["text", "json"], default="text", help="Format of the log output.")
+    parser.add_argument('--log-sample-rate', type=int, default=0, help="Log one in N unchanged selector checks per URL, 0 to only log a summary per cycle.")
+
+    parser.add_argument('--memory-budget', type=int, help="Memory budget in MB. Caches are dropped and the browser is restarted when exceeded.")
+    parser.add_argument('--file-cache-size', type=int, default=32, help="Size in MB of the stored files kept in memory.")
+    parser.add_argument('--memory-snapshot-interval', type=int, default=12, help="Number of cycles between memory snapshots.")
+    parser.add_argument('--tracemalloc-top', type=int, default=0, help="Number of largest allocation sites in memory snapshots, 0 to disable tracemalloc.")
 
     return parser.parse_args()
 
@@ -97,6 +105,7 @@ def send_daily_discord_notification(config_service):
             total_attempts = counts.get('success', 0) + counts.get('fail', 0)
             success_rate = (counts.get('success', 0) / total_attempts) * 100 if total_attempts > 0 else 0
             time_between_checks = (24 * 60 * 60) / counts.get('success', 0) if counts.get('success', 0) > 0 else 0
+            deferred = counts.get('deferred', 0)
             color_emoji = "🟢" if success_rate >= 80 else "🟡" if success_rate >= 50 else "🔴"
             message_lines.append(f"- **URL**: {url}")
             message_lines.append(f"  - State: {color_emoji}")
@@ -104,6 +113,8 @@ def send_daily_discord_notification(config_service):
             message_lines.append(f"  - Successful checks every: `{seconds_to_humantime(time_between_checks)}`")
             message_lines.append(f"  - Success: `{counts.get('success', 0)}`")
             message_lines.append(f"  - Fail: `{counts.get('fail', 0)}`")
+            if deferred:
+                message_lines.append(f"  - Deferred: `{deferred}`")
         message = "\n".join(message_lines)
 
         notif_manager = config_service.get_config("notification_manager")
@@ -113,10 +124,13 @@ def send_daily_discord_notification(config_service):
 
 
 if __name__ == "__main__":
+    # Arguments first, so that every record, including the first ones, is written in the requested format
+    args = parse_arguments()
+    logging_service = LoggingService(args.log_format)
+
     logging.info("Starting Content Monitoring System")
     update = check_for_update()
-    
-    args = parse_arguments()
+
     config_service = ConfigurationService()
     config_service.load_from_parser(args)
 
@@ -132,7 +146,22 @@ if __name__ == "__main__":
     config_service.set_config("notification_manager", NotificationManager(notif))
     notif_manager = config_service.get_config("notification_manager")
 
-    config_service.set_config("file_service", FileService(config_service.get_config("storage_dir")))
+    config_service.set_config("routine_log", RoutineLogSampler(config_service.get_config("log_sample_rate")))
+
+    config_service.set_config("file_service", FileService(
+        config_service.get_config("storage_dir"),
+        config_service.get_config("file_cache_size") * 1024 * 1024
+    ))
+    memory_monitor = MemoryMonitor(
+        config_service.get_config("file_service"),
+        config_service.get_config("memory_budget"),
+        config_service.get_config("memory_snapshot_interval"),
+        config_service.get_config("tracemalloc_top"),
+    )
+
+    dns_cache = DNSCache(config_service.get_config("dns_ttl"), config_service.get_config("dns_negative_ttl"))
+    dns_cache.install()
+    config_service.set_config("dns_cache", dns_cache)
 
     rules_formatted = "\n".join(
         f"- **URL**: {url}\n"
@@ -146,6 +175,7 @@ if __name__ == "__main__":
         "Interval": seconds_to_humantime(interval),
         "Webpage Timeout": seconds_to_humantime(config_service.get_config('webpage_timeout')),
         "API Timeout": seconds_to_humantime(config_service.get_config('api_timeout')),
+        "Cycle Budget": seconds_to_humantime(config_service.get_config('cycle_budget')),
         "Socks5 Proxy": "True" if config_service.get_config('socks5-proxy') else "False",
         "Rules": rules_formatted
         })
@@ -156,6 +186,11 @@ if __name__ == "__main__":
     
     while True:
         check_availability()
+        if memory_monitor.check():
+            logging.warning(f"Memory budget exceeded ({memory_monitor.rss() / 1024 / 1024:.1f} MB RSS), releasing memory")
+            release_memory()
+            if memory_monitor.over_budget():
+                logging.error(f"Still over the memory budget after releasing memory ({memory_monitor.rss() / 1024 / 1024:.1f} MB RSS)")
         now = datetime.now()
         if now.hour == 0 and now.minute < 60:
             send_daily_discord_notification(config_service)
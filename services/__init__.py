@@ -2,3 +2,8 @@ from .configuration_service import ConfigurationService
 from .file_service import FileService
 from .notification_service import NotificationService, NotificationManager
 from .selenium_service import SeleniumSession
+from .dns_service import DNSCache
+from .budget_service import CycleBudget
+from .rule_plan import RulePlan, CSSSelectorPlan, JSONSelectorPlan, compile_json_path
+from .memory_service import MemoryMonitor
+from .logging_service import LoggingService, RoutineLogSampler, JSONFormatter
@@ -0,0 +1,34 @@
+import time
+
+
+class CycleBudget:
+    def __init__(self, budget=None):
+        """
+        Initializes a time budget for one check cycle, in seconds. `None` means the cycle is unbounded.
+        """
+        self.budget = budget
+        self.deadline = time.monotonic() + budget if budget is not None else None
+
+    def remaining(self):
+        """
+        Returns the seconds left in the cycle, or `None` if the cycle is unbounded.
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    def exhausted(self):
+        """
+        Returns whether the cycle has run out of time.
+        """
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def request_timeout(self, timeout):
+        """
+        Clips a request's total timeout to the time left in the cycle.
+        Returns the timeout and whether the cycle budget, rather than the request's own timeout, is the limit.
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining < timeout:
+            return remaining, True
+        return timeout, False
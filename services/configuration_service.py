@@ -1,7 +1,12 @@
 import json
 import logging
+from types import MappingProxyType
+from urllib.parse import urlparse
 
 import requests
+import soupsieve
+
+from .rule_plan import CSSSelectorPlan, JSONSelectorPlan, RulePlan, compile_json_path
 
 
 class ConfigurationService:
@@ -31,23 +36,21 @@ class ConfigurationService:
         if args.interval < 5:
             logging.error("Interval must be at least 5 seconds.")
             exit(1)
-        if args.webpage_timeout < 0 or args.api_timeout < 0:
+        if args.webpage_timeout < 0 or args.api_timeout < 0 or args.selenium_timeout < 0:
             logging.error("Timeout must be a positive integer.")
             exit(1)
+        if (args.connect_timeout is not None and args.connect_timeout <= 0) or (args.read_timeout is not None and args.read_timeout <= 0):
+            logging.error("Connect and read timeouts must be positive integers.")
+            exit(1)
+        if args.cycle_budget is not None and args.cycle_budget <= 0:
+            logging.error("Cycle budget must be a positive integer.")
+            exit(1)
 
         self.set_config("storage_dir", args.storage_dir)
         self.set_config("discord_webhook_url", args.webhook)
         self.set_config("mention_users", args.mention_users.split(",") if args.mention_users else None)
         self.set_config("interval", args.interval)
-
-        # Parse rules JSON
-        try:
-            rules = json.loads(args.rules)
-            self.validate_rules(rules)
-            self.set_config("rules", rules)
-        except json.JSONDecodeError as e:
-            logging.error(f"Failed to parse rules JSON: {e}")
-            exit(1)
+        self.set_config("cycle_budget", args.cycle_budget if args.cycle_budget is not None else args.interval)
 
         # Optional user agents
         self.set_config("webpage_user_agent", args.webpage_user_agent)
@@ -56,22 +59,58 @@ class ConfigurationService:
 
         self.set_config("webpage_timeout", args.webpage_timeout)
         self.set_config("api_timeout", args.api_timeout)
+        self.set_config("selenium_timeout", args.selenium_timeout)
+        self.set_config("connect_timeout", args.connect_timeout)
+        self.set_config("read_timeout", args.read_timeout)
+
+        if args.dns_ttl < 0 or args.dns_negative_ttl < 0:
+            logging.error("DNS TTL must be a positive integer.")
+            exit(1)
+        self.set_config("dns_ttl", args.dns_ttl)
+        self.set_config("dns_negative_ttl", args.dns_negative_ttl)
+
+        if (args.memory_budget is not None and args.memory_budget <= 0) or args.file_cache_size < 0 \
+                or args.memory_snapshot_interval < 0 or args.tracemalloc_top < 0:
+            logging.error("Memory settings must be positive integers.")
+            exit(1)
+        if args.log_sample_rate < 0:
+            logging.error("Log sample rate must be a positive integer.")
+            exit(1)
+        self.set_config("log_sample_rate", args.log_sample_rate)
+
+        self.set_config("memory_budget", args.memory_budget)
+        self.set_config("file_cache_size", args.file_cache_size)
+        self.set_config("memory_snapshot_interval", args.memory_snapshot_interval)
+        self.set_config("tracemalloc_top", args.tracemalloc_top)
 
         if args.socks5_proxy:
+            proxy = args.socks5_proxy
+            if args.socks5_remote_dns and proxy.startswith("socks5://"):
+                # socks5h:// lets the proxy resolve hostnames instead of the local resolver
+                proxy = "socks5h://" + proxy[len("socks5://"):]
             socks5_proxy = {
-                "http": args.socks5_proxy,
-                "https": args.socks5_proxy
+                "http": proxy,
+                "https": proxy
             }
-            self.validate_proxy(args.socks5_proxy)
+            self.validate_proxy(proxy)
             self.set_config("socks5-proxy", socks5_proxy)
 
+        # Parse rules JSON, last since the compiled rule plans embed the user agents and proxy
+        try:
+            rules = json.loads(args.rules)
+            self.set_config("rule_plans", self.validate_rules(rules))
+            self.set_config("rules", rules)
+        except json.JSONDecodeError as e:
+            logging.error(f"Failed to parse rules JSON: {e}")
+            exit(1)
+
     def validate_proxy(self, proxy):
         """Validates that the proxy is in the correct format."""
         if not proxy:
             return
 
-        if not proxy.startswith("socks5://"):
-            raise ValueError("Proxy must start with 'socks5://'.")
+        if not proxy.startswith(("socks5://", "socks5h://")):
+            raise ValueError("Proxy must start with 'socks5://' or 'socks5h://'.")
         
         # Test with a a google.com request
         try:
@@ -81,7 +120,10 @@ class ConfigurationService:
             raise ValueError(f"Proxy test failed: {e}")
     
     def validate_rules(self, rules):
-        """Validates that each rule has either 'api_check' or 'webpage_check' with required fields."""
+        """
+        Validates that each rule has either 'api_check' or 'webpage_check' with required fields,
+        and returns the compiled RulePlan of each rule by URL.
+        """
         if not isinstance(rules, dict):
             raise ValueError("Rules should be a dictionary.")
 
@@ -89,6 +131,9 @@ class ConfigurationService:
             if "api_check" not in rule and "webpage_check" not in rule:
                 raise ValueError(f"Rule for {url} must specify either 'api_check' or 'webpage_check'.")
 
+            if "priority" in rule and (not isinstance(rule["priority"], int) or isinstance(rule["priority"], bool)):
+                raise ValueError(f"Rule for {url} requires an integer 'priority'.")
+
             if rule.get("api_check"):
                 if "json_selectors" not in rule or not isinstance(rule["json_selectors"], list) or not rule["json_selectors"]:
                     raise ValueError(f"API rule for {url} requires a non-empty 'json_selectors' list.")
@@ -96,3 +141,54 @@ class ConfigurationService:
             if rule.get("webpage_check"):
                 if "selectors" not in rule or not isinstance(rule["selectors"], list) or not rule["selectors"]:
                     raise ValueError(f"Webpage rule for {url} requires a non-empty 'selectors' list.")
+                if rule.get("xhr_discovery") and not rule.get("use_selenium"):
+                    raise ValueError(f"Webpage rule for {url} requires 'use_selenium' to use 'xhr_discovery'.")
+
+        return {url: self.compile_rule(url, rule) for url, rule in rules.items()}
+
+    def compile_rule(self, url, rule):
+        """Compiles a validated rule into an immutable RulePlan, precompiling its selectors."""
+        api_check = bool(rule.get("api_check", False))
+        if api_check:
+            headers = {
+                "User-Agent": self.get_config("api_user_agent"),
+                "Accept": "application/json"
+            }
+            proxies = self.get_config("socks5-proxy", {})
+        else:
+            headers = {
+                "User-Agent": self.get_config("webpage_user_agent")
+            }
+            proxies = {}
+
+        selectors = []
+        if rule.get("webpage_check") and not api_check:
+            for selector in rule["selectors"]:
+                try:
+                    compiled = soupsieve.compile(selector)
+                except soupsieve.SelectorSyntaxError as e:
+                    raise ValueError(f"Invalid CSS selector '{selector}' for {url}: {e}")
+                selectors.append(CSSSelectorPlan(selector, compiled, f"{url}:{selector}"))
+
+        json_selectors = []
+        if api_check:
+            for selector in rule["json_selectors"]:
+                json_selectors.append(JSONSelectorPlan(selector, compile_json_path(selector)))
+
+        return RulePlan(
+            url=url,
+            origin=urlparse(url),
+            api_check=api_check,
+            webpage_check=bool(rule.get("webpage_check", False)),
+            use_selenium=bool(rule.get("use_selenium", False)),
+            xhr_discovery=bool(rule.get("xhr_discovery", False)),
+            notification_on_error=rule.get("notification_on_error", True),
+            priority=rule.get("priority", 0),
+            headers=MappingProxyType(headers),
+            proxies=MappingProxyType(dict(proxies)),
+            selectors=tuple(selectors),
+            json_selectors=tuple(json_selectors),
+            discovered_from=rule.get("discovered_from"),
+            # A discovered API can back several pages, or an api_check rule, with different selectors
+            state_key=f"xhr:{rule['discovered_from']}" if rule.get("discovered_from") else url,
+        )
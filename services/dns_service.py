@@ -0,0 +1,113 @@
+import logging
+import socket
+import threading
+import time
+from urllib.parse import ParseResult, urlparse
+
+from urllib3.util.connection import allowed_gai_family
+
+
+class DNSCache:
+    def __init__(self, ttl=300, negative_ttl=30):
+        """
+        Initializes an in-process cache in front of the system resolver.
+
+        The system resolver does not expose record TTLs, so positive answers are kept
+        for `ttl` seconds and failed lookups for `negative_ttl` seconds.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._getaddrinfo = socket.getaddrinfo
+
+    def install(self):
+        """
+        Routes every `socket.getaddrinfo` call (and so every `requests` connection) through the cache.
+        """
+        if socket.getaddrinfo is not self.getaddrinfo:
+            socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self):
+        """
+        Restores the original system resolver.
+        """
+        socket.getaddrinfo = self._getaddrinfo
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """
+        Drop-in replacement for `socket.getaddrinfo` serving answers from the cache when possible.
+        """
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        entry = self._cached(key, now)
+        if entry is not None:
+            if entry[0] == "error":
+                # A new exception on every hit, re-raising a stored one would keep growing its traceback
+                raise socket.gaierror(*entry[1])
+            return entry[1]
+
+        try:
+            result = self._getaddrinfo(host, port, family, type, proto, flags)
+        except socket.gaierror as e:
+            with self._lock:
+                self._cache[key] = (now + self.negative_ttl, ("error", (e.errno, e.strerror)))
+            raise
+
+        with self._lock:
+            self._cache[key] = (now + self.ttl, ("result", result))
+        return result
+
+    def _cached(self, key, now):
+        """
+        Returns the unexpired cache entry for a `getaddrinfo` call, as a tuple of its kind and value, or None.
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        return None
+
+    def prefetch(self, urls, socks=False, proxy=False):
+        """
+        Resolves the hostnames of the given URLs (strings or parsed) ahead of time.
+        Hosts already cached are skipped, the resolver time of the others is logged and returned per host in seconds.
+
+        With `socks`, hosts are resolved the way PySocks does before handing the address to the proxy.
+        With `proxy`, the URLs are SOCKS proxies, resolved the way PySocks does before connecting to them.
+        """
+        timings = {}
+        for url in urls:
+            parsed = url if isinstance(url, ParseResult) else urlparse(url)
+            host = parsed.hostname
+            if not host or host in timings:
+                continue
+            port = parsed.port or {"http": 80, "https": 443}.get(parsed.scheme, 1080)
+
+            # Same arguments as the actual connection, so the entry is reused by the request
+            if proxy:
+                args = (host, port, 0, socket.SOCK_STREAM)
+            elif socks:
+                args = (host, port, socket.AF_UNSPEC, socket.SOCK_STREAM, socket.IPPROTO_TCP, socket.AI_ADDRCONFIG)
+            else:
+                args = (host, port, allowed_gai_family(), socket.SOCK_STREAM)
+            key = args + (0,) * (6 - len(args))
+            if self._cached(key, time.monotonic()) is not None:
+                continue
+
+            start = time.perf_counter()
+            try:
+                self.getaddrinfo(*args)
+            except socket.gaierror as e:
+                logging.warning(f"Failed to resolve {host} in {(time.perf_counter() - start) * 1000:.1f} ms: {e}")
+            else:
+                logging.info(f"Resolved {host} in {(time.perf_counter() - start) * 1000:.1f} ms")
+            timings[host] = time.perf_counter() - start
+        return timings
+
+    def clear(self):
+        """
+        Drops every cached answer.
+        """
+        with self._lock:
+            self._cache.clear()
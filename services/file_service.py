@@ -1,15 +1,20 @@
 import os
 import json
+from collections import OrderedDict
 
 
 class FileService:
-    # TODO: Add Cache Invalidation and Thread Safety
-    def __init__(self, base_dir: str):
+    # TODO: Add Thread Safety
+    def __init__(self, base_dir: str, max_cache_bytes: int = None):
         """
         Initializes the FileService with a base directory where files are stored.
+        Loaded files are cached, least recently used first out once their total size
+        on disk exceeds `max_cache_bytes` (unbounded if None).
         """
         self.base_dir = base_dir
-        self._cache = {}
+        self.max_cache_bytes = max_cache_bytes
+        self._cache = OrderedDict()
+        self._cache_sizes = {}
 
     def _get_full_path(self, file_name: str) -> str:
         """
@@ -17,28 +22,57 @@ class FileService:
         """
         return os.path.join(self.base_dir, file_name)
 
-    def save_json(self, file_name: str, data: dict) -> None:
+    def _cache_put(self, file_name: str, data: dict, size: int) -> None:
+        """
+        Caches the data of a file and evicts the least recently used files beyond the cache size.
+        """
+        self._cache[file_name] = data
+        self._cache.move_to_end(file_name)
+        self._cache_sizes[file_name] = size
+        if self.max_cache_bytes is None:
+            return
+        while len(self._cache) > 1 and self.cache_size() > self.max_cache_bytes:
+            evicted, _ = self._cache.popitem(last=False)
+            del self._cache_sizes[evicted]
+
+    def cache_size(self) -> int:
+        """
+        Returns the total size on disk, in bytes, of the cached files.
+        """
+        return sum(self._cache_sizes.values())
+
+    def clear_cache(self) -> None:
+        """
+        Drops every cached file, they are read from disk again on the next load.
+        """
+        self._cache.clear()
+        self._cache_sizes.clear()
+
+    def save_json(self, file_name: str, data: dict, cache: bool = True) -> None:
         """
         Saves a dictionary as a JSON file.
         """
         file_path = self._get_full_path(file_name)
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        content = json.dumps(data, indent=4)
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
-        self._cache[file_name] = data
+            f.write(content)
+        if cache:
+            self._cache_put(file_name, data, len(content))
 
     def load_json(self, file_name: str) -> dict:
         """
         Loads JSON data from a file.
         """
         if file_name in self._cache:
+            self._cache.move_to_end(file_name)
             return self._cache[file_name]
         file_path = self._get_full_path(file_name)
         if os.path.exists(file_path):
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                self._cache[file_name] = data
-                return data
+            self._cache_put(file_name, data, os.path.getsize(file_path))
+            return data
         else:
-            self._cache[file_name] = {}
+            self._cache_put(file_name, {}, 0)
             return {}
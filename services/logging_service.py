@@ -0,0 +1,126 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+from collections import defaultdict
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has, anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        """
+        Formats a record as a single-line JSON object, including the fields passed through `extra`.
+        """
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class RecordQueueHandler(QueueHandler):
+    def prepare(self, record):
+        """
+        Merges the arguments into the message like QueueHandler, but keeps the exception information
+        so that the listener's formatter renders the traceback (as the 'exception' field in JSON).
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+class LoggingService:
+    def __init__(self, log_format="text", level=logging.INFO):
+        """
+        Routes every log record through a queue so that logging never blocks a check on writing to stdout.
+        The records are formatted and written by a background listener thread.
+        """
+        self._queue = queue.SimpleQueue()
+        self._handler = logging.StreamHandler()
+        self._running = False
+        self.set_format(log_format)
+        self._listener = QueueListener(self._queue, self._handler, respect_handler_level=True)
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(RecordQueueHandler(self._queue))
+        root.setLevel(level)
+
+        self._listener.start()
+        self._running = True
+        atexit.register(self.stop)
+
+    def set_format(self, log_format):
+        """
+        Switches the output between plain text and JSON lines.
+        The records already queued are written in the previous format before the switch.
+        """
+        if log_format == "json":
+            formatter = JSONFormatter()
+        elif log_format == "text":
+            formatter = logging.Formatter(TEXT_FORMAT)
+        else:
+            raise ValueError(f"Unknown log format '{log_format}'.")
+
+        # The listener thread formats the records, only swap the formatter while it is stopped
+        if self._running:
+            self._listener.stop()
+        self._handler.setFormatter(formatter)
+        if self._running:
+            self._listener.start()
+
+    def stop(self):
+        """
+        Writes the records still queued and stops the listener thread.
+        """
+        if self._running:
+            self._listener.stop()
+            self._running = False
+
+
+class RoutineLogSampler:
+    def __init__(self, sample_rate=0):
+        """
+        Aggregates routine per-selector events into one summary line per cycle.
+        With a `sample_rate` of N, one in N events of each URL is also logged individually (none if 0).
+        """
+        self.sample_rate = sample_rate
+        self._seen = defaultdict(int)
+        self._cycle_counts = defaultdict(int)
+
+    def record(self, url, message, *args):
+        """
+        Records a routine event of a URL. `message` is only formatted if the event is sampled.
+        """
+        self._cycle_counts[url] += 1
+        self._seen[url] += 1
+        if self.sample_rate and (self._seen[url] - 1) % self.sample_rate == 0:
+            logging.info(message, *args)
+
+    def flush(self):
+        """
+        Logs the summary of the routine events of the cycle and starts a new one.
+        """
+        if self._cycle_counts:
+            logging.info(
+                "No change detected for %d selectors on %d URLs",
+                sum(self._cycle_counts.values()), len(self._cycle_counts),
+            )
+        self._cycle_counts.clear()
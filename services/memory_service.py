@@ -0,0 +1,124 @@
+import gc
+import logging
+import os
+import time
+import tracemalloc
+
+
+class MemoryMonitor:
+    def __init__(self, file_service, budget_mb=None, snapshot_interval=12, tracemalloc_top=0):
+        """
+        Initializes the monitor of the process memory.
+
+        A snapshot of the RSS, and of the `tracemalloc_top` largest allocation sites if above 0,
+        is written to 'memory_snapshot.json' every `snapshot_interval` cycles.
+        """
+        self.file_service = file_service
+        self.budget_bytes = budget_mb * 1024 * 1024 if budget_mb else None
+        self.snapshot_interval = snapshot_interval
+        self.tracemalloc_top = tracemalloc_top
+        self._cycles = 0
+
+        if tracemalloc_top > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @staticmethod
+    def _process_rss(pid):
+        """
+        Returns the resident set size of a process in bytes.
+        """
+        with open(f"/proc/{pid}/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    @staticmethod
+    def _descendants(pid):
+        """
+        Returns the PIDs of every descendant of a process, such as chromedriver and the Chromium processes.
+        """
+        children = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", 'r') as f:
+                    # The command name can contain spaces, the parent PID is the second field after it
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+
+        descendants = []
+        pending = [pid]
+        while pending:
+            for child in children.get(pending.pop(), []):
+                descendants.append(child)
+                pending.append(child)
+        return descendants
+
+    def rss(self, include_children=True):
+        """
+        Returns the resident set size in bytes of the process and, by default, of its child processes,
+        so that the browser started by Selenium counts toward the budget.
+        Returns None if /proc cannot be read.
+        """
+        try:
+            total = self._process_rss(os.getpid())
+        except (OSError, ValueError, IndexError):
+            return None
+        if include_children:
+            for pid in self._descendants(os.getpid()):
+                try:
+                    total += self._process_rss(pid)
+                except (OSError, ValueError, IndexError):
+                    # The process exited in the meantime
+                    continue
+        return total
+
+    def over_budget(self):
+        """
+        Returns whether the process uses more memory than its budget.
+        """
+        if self.budget_bytes is None:
+            return False
+        rss = self.rss()
+        if rss is None:
+            logging.warning("Memory budget not enforced: the RSS cannot be read from /proc")
+            return False
+        return rss > self.budget_bytes
+
+    def check(self):
+        """
+        Called once per cycle. Writes a snapshot when due and returns whether the process is over budget.
+        """
+        self._cycles += 1
+        if self.snapshot_interval and self._cycles % self.snapshot_interval == 0:
+            self.write_snapshot()
+        return self.over_budget()
+
+    def write_snapshot(self):
+        """
+        Writes the current RSS and, when tracemalloc is enabled, the largest allocation sites to the storage directory.
+        """
+        rss = self.rss()
+        snapshot = {
+            "timestamp": time.time(),
+            "rss": rss,
+            "rss_self": self.rss(include_children=False),
+            "budget": self.budget_bytes,
+            "file_cache": self.file_service.cache_size(),
+            "gc_objects": len(gc.get_objects()),
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            statistics = tracemalloc.take_snapshot().statistics("lineno")[:self.tracemalloc_top]
+            snapshot["traced"] = current
+            snapshot["traced_peak"] = peak
+            snapshot["top"] = [
+                {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+                for stat in statistics
+            ]
+        if rss is None:
+            logging.warning("Memory usage unavailable: the RSS cannot be read from /proc")
+        else:
+            logging.info(f"Memory usage: {rss / 1024 / 1024:.1f} MB RSS including child processes")
+        self.file_service.save_json('memory_snapshot.json', snapshot, cache=False)
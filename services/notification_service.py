@@ -103,6 +103,18 @@ class NotificationManager:
                 "description": "A change was detected on the API.",
                 "color": "#0d6efd",
             },
+            "xhr_api_discovered": {
+                "title": "Backing API Discovered",
+                "description": "The webpage is now checked through the JSON API that fills it.",
+                "color": "#0dcaf0",
+                "mention_user": False,
+            },
+            "xhr_api_fallback": {
+                "title": "Backing API Check Failed",
+                "description": "The discovered JSON API failed repeatedly, the webpage is rendered until the API is discovered again.",
+                "color": "#ffc107",
+                "mention_user": False,
+            },
             "webpage_check_failed": {
                 "title": "Webpage Check Failed",
                 "description": "Error fetching webpage data.",
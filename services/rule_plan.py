@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional
+from urllib.parse import ParseResult
+
+import soupsieve
+
+
+def compile_json_path(path):
+    """
+    Splits a JSON selector in dot notation into its keys, converting list indices to integers.
+    """
+    keys = tuple(int(key) if key.isdigit() else key for key in path.split("."))
+    if any(key == "" for key in keys):
+        raise ValueError(f"Invalid JSON selector '{path}'.")
+    return keys
+
+
+@dataclass(frozen=True)
+class CSSSelectorPlan:
+    selector: str
+    compiled: soupsieve.SoupSieve
+    key: str  # Key of the selector in previous_data.json and missing_data.json
+
+
+@dataclass(frozen=True)
+class JSONSelectorPlan:
+    selector: str
+    keys: tuple
+
+
+@dataclass(frozen=True)
+class RulePlan:
+    """
+    Immutable, pre-validated form of a rule, compiled once at startup by ConfigurationService.
+    """
+    url: str
+    origin: ParseResult
+    api_check: bool
+    webpage_check: bool
+    use_selenium: bool
+    xhr_discovery: bool
+    notification_on_error: bool
+    priority: int
+    headers: MappingProxyType
+    proxies: MappingProxyType
+    selectors: tuple = ()
+    json_selectors: tuple = ()
+    discovered_from: Optional[str] = None
+    state_key: str = ""  # Key of an API rule's values in previous_data.json
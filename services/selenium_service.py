@@ -1,4 +1,7 @@
+import base64
+import json
 import logging
+import time
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
@@ -6,26 +9,38 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 
 
 class SeleniumSession:
-    def __init__(self):
-        # Initialize the browser session
+    def __init__(self, capture_network=False):
+        # Initialize the browser session, recording network traffic in the performance log if requested
+        self.capture_network = capture_network
         self.options = Options()
         self.options.add_argument("--headless")
         self.options.add_argument("--disable-gpu")
         self.options.add_argument("--no-sandbox")
         self.options.add_argument("--disable-dev-shm-usage")
-        self.options.set_capability("goog:loggingPrefs", {"browser": "ALL"})
+        logging_prefs = {"browser": "ALL"}
+        if capture_network:
+            logging_prefs["performance"] = "ALL"
+        self.options.set_capability("goog:loggingPrefs", logging_prefs)
         self.options.binary_location = "/usr/bin/chromium"  # Chromium binary location
         self.service = ChromeService("/usr/bin/chromedriver")
         self.driver = webdriver.Chrome(service=self.service, options=self.options)
 
-    def fetch_page(self, url):
-        # Fetch page content
+    def fetch_page(self, url, timeout=None):
+        # Fetch page content, bounding the whole render by `timeout` seconds when given
         try:
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            if deadline is not None:
+                self.driver.set_page_load_timeout(timeout)
+            if self.capture_network:
+                # Drop the traffic of previously loaded pages
+                self.driver.get_log("performance")
             self.driver.get(url)
-            WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            wait_timeout = min(10, max(deadline - time.monotonic(), 0)) if deadline is not None else 10
+            WebDriverWait(self.driver, wait_timeout).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
 
             logs = self.driver.get_log("browser")
             error_logs = [entry for entry in logs if entry["level"] == "SEVERE"]
@@ -40,6 +55,46 @@ class SeleniumSession:
             logging.error(f"Error fetching page {url} using Selenium: {e}")
             raise
 
+    def fetch_json_responses(self, url, selectors=(), timeout=None):
+        # Render the page and collect the JSON bodies of the GET requests it made, keyed by request URL
+        if not self.capture_network:
+            raise RuntimeError("Network capture is not enabled for this Selenium session.")
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self.fetch_page(url, timeout)
+
+        # The XHRs filling the page may still be in flight once the body exists
+        for selector in selectors:
+            wait_timeout = min(10, max(deadline - time.monotonic(), 0)) if deadline is not None else 10
+            try:
+                WebDriverWait(self.driver, wait_timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+            except TimeoutException:
+                logging.warning(f"Element {selector} did not appear on {url} during network capture")
+        page_source = self.driver.page_source
+
+        methods = {}
+        json_requests = {}
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            params = message.get("params", {})
+            if message["method"] == "Network.requestWillBeSent":
+                methods[params["requestId"]] = params["request"]["method"]
+            elif message["method"] == "Network.responseReceived" and "json" in params["response"].get("mimeType", ""):
+                json_requests[params["requestId"]] = params["response"]["url"]
+
+        json_responses = {}
+        for request_id, response_url in json_requests.items():
+            if methods.get(request_id) != "GET":
+                continue
+            try:
+                response = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                body = base64.b64decode(response["body"]) if response.get("base64Encoded") else response["body"]
+                json_responses[response_url] = json.loads(body)
+            except Exception as e:
+                logging.warning(f"Could not read JSON response from {response_url}: {e}")
+
+        return page_source, json_responses
+
     def close(self):
         # Close the browser session
         if self.driver:
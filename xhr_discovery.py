@@ -0,0 +1,127 @@
+import json
+import logging
+import argparse
+
+from bs4 import BeautifulSoup
+from services import ConfigurationService, SeleniumSession
+
+
+def find_json_path(json_data, text):
+    """
+    Finds the first value in a JSON object whose text equals `text` and returns its path in dot notation,
+    the format used by 'json_selectors'. Returns None if no value matches.
+    """
+    if isinstance(json_data, dict):
+        items = json_data.items()
+    elif isinstance(json_data, list):
+        items = enumerate(json_data)
+    else:
+        if json_data is None or isinstance(json_data, bool):
+            return None
+        value = json_data if isinstance(json_data, str) else json.dumps(json_data)
+        return "" if value.strip() == text else None
+
+    for key, value in items:
+        path = find_json_path(value, text)
+        if path is not None:
+            return f"{key}.{path}" if path else str(key)
+    return None
+
+
+def capture_page(plan, selenium_session, timeout=None):
+    """
+    Renders a Selenium rule plan's page while recording its network traffic.
+    Returns the page source and the JSON responses of the page by request URL.
+    """
+    selectors = [selector_plan.selector for selector_plan in plan.selectors]
+    return selenium_session.fetch_json_responses(plan.url, selectors, timeout)
+
+
+def discover_api_rule(plan, page_source, json_responses):
+    """
+    Looks for a JSON response of a captured page containing the text of every CSS selector of the rule.
+
+    Returns a tuple of the API URL and a dictionary mapping each CSS selector to its JSON selector,
+    or None if no single response covers all selectors.
+    Raises ValueError if an element is missing or empty on the page, as there is nothing to look up.
+    """
+    url = plan.url
+    soup = BeautifulSoup(page_source, 'html.parser')
+
+    texts = {}
+    for selector_plan in plan.selectors:
+        element = selector_plan.compiled.select_one(soup)
+        if element is None or not element.get_text(strip=True):
+            raise ValueError(f"No text to look up for {url} with selector {selector_plan.selector}")
+        texts[selector_plan.selector] = element.get_text(strip=True)
+    soup.decompose()
+
+    for api_url, json_data in json_responses.items():
+        json_selectors = {}
+        for selector, text in texts.items():
+            path = find_json_path(json_data, text)
+            if not path:
+                break
+            json_selectors[selector] = path
+        else:
+            logging.info(f"Discovered API {api_url} behind {url}")
+            return api_url, json_selectors
+
+    logging.info(f"No JSON response behind {url} matches all selectors ({len(json_responses)} inspected)")
+    return None
+
+
+def suggest_api_rule(plan, json_selectors):
+    """
+    Builds an 'api_check' rule equivalent to a webpage rule plan from the discovered JSON selectors.
+    """
+    api_rule = {
+        "api_check": True,
+        "json_selectors": [json_selectors[selector_plan.selector] for selector_plan in plan.selectors],
+    }
+    if not plan.notification_on_error:
+        api_rule["notification_on_error"] = False
+    if plan.priority:
+        api_rule["priority"] = plan.priority
+    return api_rule
+
+
+def parse_arguments():
+    """Parses command-line arguments."""
+    parser = argparse.ArgumentParser(description="Discover the JSON APIs behind Selenium rules")
+    parser.add_argument('--rules', type=str, required=True, help="JSON string defining the rules for availability checks.")
+    parser.add_argument('--timeout', type=int, default=30, help="Timeout for each page render in seconds.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler()
+        ],
+    )
+
+    args = parse_arguments()
+    rule_plans = ConfigurationService().validate_rules(json.loads(args.rules))
+    selenium_session = SeleniumSession(capture_network=True)
+
+    suggestions = {}
+    try:
+        for url, plan in rule_plans.items():
+            if plan.api_check or not plan.webpage_check or not plan.use_selenium:
+                continue
+            try:
+                page_source, json_responses = capture_page(plan, selenium_session, args.timeout)
+                discovered = discover_api_rule(plan, page_source, json_responses)
+            except Exception as e:
+                logging.error(f"Discovery failed for {url}: {e}")
+                continue
+            if discovered:
+                api_url, json_selectors = discovered
+                suggestions[api_url] = suggest_api_rule(plan, json_selectors)
+    finally:
+        selenium_session.close()
+
+    print(json.dumps(suggestions, indent=4))